@@ -1,15 +1,23 @@
 #!/bin/env python
 
+import csv
 import time
 import asyncio
 import argparse
 import requests
 import random
+import psutil
+import shutil
+import tempfile
 from sys import argv, exit
-from math import floor
+from math import floor, ceil
+from collections import deque
 from multiprocessing import cpu_count
-from tranco import Tranco
-from playwright.async_api import async_playwright, BrowserContext
+from os import path
+from typing import Optional
+import tranco_list
+from playwright.async_api import async_playwright, BrowserContext, Page, Playwright
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
 
 # Path to the extension
 PATH_TO_EXTENSION = "<enter your path here>/wam-detector/distribution"
@@ -22,6 +30,16 @@ TRANCO_LIST_DATE = '2022-05-03'
 LIST_OFFSET = 0
 NUM_DOMAINS = 0
 BATCH_SIZE = cpu_count()*2
+MIN_CONCURRENCY = 1
+MAX_CONCURRENCY = cpu_count()*8
+# Per-domain timing telemetry generated by this script
+TIMINGS_OUT = 'timings.csv'
+# Browser memory telemetry generated by this script
+MEMORY_OUT = 'memory.csv'
+# Recycle the browser context after this many domains
+RECYCLE_DOMAINS = 1000
+# Recycle the browser context when its memory usage exceeds this value in MB
+RECYCLE_RSS = 4096
 
 # Playwright action timeout in ms
 ACTION_TIMEOUT = 75 * 1000
@@ -30,32 +48,262 @@ FALLBACK_TIMEOUT = 90.0
 # Time to wait after page finished loading in seconds
 PAGE_SLEEP = 5.0
 
+# Number of finished domains the concurrency controller bases its decisions on
+CONTROL_WINDOW = 20
+# Above these limits the number of concurrent tabs is reduced
+TIMEOUT_RATE_HIGH = 0.25
+LATENCY_P90_HIGH = FALLBACK_TIMEOUT / 2
+CPU_HIGH = 90.0
+MEMORY_HIGH = 90.0
+# Below these limits the number of concurrent tabs is increased
+TIMEOUT_RATE_LOW = 0.05
+LATENCY_P90_LOW = FALLBACK_TIMEOUT / 6
+CPU_LOW = 70.0
+MEMORY_LOW = 80.0
+
+# Recycle the browser context when this many pages could not be closed
+RECYCLE_LEAKED = 5
+# Interval in which the memory usage of the browser is recorded in seconds
+MEMORY_INTERVAL = 10.0
+
 # List of domains that should not be processed.
 blocklist = ['pootin.dog']
 
 
+# Returns the p-th percentile (0-100) of a list of values.
+def percentile(values: list[float], p: float) -> float:
+    if len(values) == 0:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, ceil(p/100 * len(ordered)) - 1)]
+
+
+# Adjusts the number of concurrent tabs based on recent timeouts,
+# navigation latency and the CPU and memory pressure of the host.
+# The limit is increased additively and decreased multiplicatively.
+class ConcurrencyController():
+    def __init__(self, initial: int, minimum: int, maximum: int):
+        # Lower and upper bound of the limit
+        self.minimum: int = minimum
+        self.maximum: int = maximum
+        # Current number of concurrent tabs
+        self.limit: int = min(max(initial, minimum), maximum)
+        # Whether the most recent domains timed out
+        self.timeouts: deque[bool] = deque(maxlen=CONTROL_WINDOW)
+        # Navigation latency of the most recent domains in seconds
+        self.latencies: deque[float] = deque(maxlen=CONTROL_WINDOW)
+        # Number of domains finished since the last decision
+        self.finished: int = 0
+
+        # Prime the CPU measurement, the first call always returns 0.0
+        psutil.cpu_percent(interval=None)
+
+    # Record the outcome of a finished domain.
+    def record(self, timed_out: bool, latency: float):
+        self.timeouts.append(timed_out)
+        self.latencies.append(latency)
+        self.finished += 1
+
+    # Re-evaluate the limit once enough new samples were recorded.
+    # Returns the (possibly changed) limit.
+    def adjust(self) -> int:
+        if self.finished < min(CONTROL_WINDOW, self.limit):
+            return self.limit
+        self.finished = 0
+
+        timeout_rate = sum(self.timeouts) / len(self.timeouts)
+        p50 = percentile(list(self.latencies), 50)
+        p90 = percentile(list(self.latencies), 90)
+        cpu = psutil.cpu_percent(interval=None)
+        memory = psutil.virtual_memory().percent
+
+        old = self.limit
+        if (timeout_rate > TIMEOUT_RATE_HIGH or p90 > LATENCY_P90_HIGH
+            or cpu > CPU_HIGH or memory > MEMORY_HIGH):
+            self.limit = max(self.minimum, floor(self.limit * 0.75))
+        elif (timeout_rate < TIMEOUT_RATE_LOW and p90 < LATENCY_P90_LOW
+              and cpu < CPU_LOW and memory < MEMORY_LOW):
+            self.limit = min(self.maximum, self.limit + 1)
+
+        if self.limit != old:
+            print(f'⚙️ concurrency {old} -> {self.limit} '
+                  f'(timeouts: {timeout_rate:.0%}, p50: {p50:.1f}s, p90: {p90:.1f}s, '
+                  f'cpu: {cpu:.0f}%, memory: {memory:.0f}%)')
+        return self.limit
+
+
+# Browser context with the extension that is replaced by a fresh one
+# after a number of domains or when it uses too much memory.
+class BrowserSession():
+    def __init__(self, playwright: Playwright, args: list[str]):
+        self.playwright: Playwright = playwright
+        # Browser command line arguments
+        self.args: list[str] = args
+        # Whether the profile of the current context is a temporary copy
+        self.temporary: bool = False
+        self.context: BrowserContext = None
+        # Profile directory of the current context
+        self.profile: str = USER_DATA_DIR
+        # Main browser process of the current context
+        self.process: psutil.Process = None
+        # Number of domains started in the current context
+        self.domains: int = 0
+        # Number of pages that could not be closed in the current context
+        self.leaked: int = 0
+        # Browser memory usage in MB at the last measurement
+        self.rss: float = 0.0
+
+    # Launch a new context. When configuring, USER_DATA_DIR is used directly,
+    # so that changes to the settings persist. Otherwise the context starts from
+    # a copy of it, without the state of previous contexts.
+    async def launch(self, configure: bool = False):
+        self.temporary = not configure
+        if configure:
+            self.profile = USER_DATA_DIR
+        else:
+            self.profile = tempfile.mkdtemp(prefix='wam-profile-')
+            if path.isdir(USER_DATA_DIR):
+                shutil.copytree(USER_DATA_DIR, self.profile, dirs_exist_ok=True,
+                                ignore=shutil.ignore_patterns('Singleton*', 'Cache', 'Code Cache', 'GPUCache'))
+
+        self.context = await self.playwright.chromium.launch_persistent_context(
+            self.profile,
+            headless=False,
+            args=self.args,
+        )
+        self.domains = 0
+        self.leaked = 0
+        self.process = self.findBrowserProcess()
+
+    # Find the main browser process by its profile directory.
+    def findBrowserProcess(self) -> psutil.Process:
+        for process in psutil.Process().children(recursive=True):
+            try:
+                if f'--user-data-dir={self.profile}' in process.cmdline():
+                    return process
+            except psutil.Error:
+                pass
+        return None
+
+    # Returns all processes of the browser.
+    def processes(self) -> list[psutil.Process]:
+        if self.process is None:
+            return []
+        try:
+            return [self.process] + self.process.children(recursive=True)
+        except psutil.Error:
+            return []
+
+    # Returns the memory usage of the browser and its renderers in MB
+    # and the number of renderer processes.
+    def memory(self) -> tuple[float, float, int]:
+        total = 0
+        renderer = 0
+        renderers = 0
+        for process in self.processes():
+            try:
+                rss = process.memory_info().rss
+                total += rss
+                if '--type=renderer' in process.cmdline():
+                    renderer += rss
+                    renderers += 1
+            except psutil.Error:
+                pass
+        self.rss = total / 2**20
+        return (self.rss, renderer / 2**20, renderers)
+
+    def needsRecycling(self) -> bool:
+        return (self.domains >= RECYCLE_DOMAINS
+                or self.rss >= RECYCLE_RSS
+                or self.leaked >= RECYCLE_LEAKED)
+
+    # Close the context, kill the browser if it does not shut down.
+    # Returns whether the shutdown was clean.
+    async def close(self) -> bool:
+        processes = self.processes()
+        clean = True
+        try:
+            await asyncio.wait_for(self.context.close(), timeout=FALLBACK_TIMEOUT)
+        except Exception as e:
+            print(f'⚠️ Unable to close browser context, killing it: {e}')
+            clean = False
+            for process in processes:
+                try:
+                    process.kill()
+                except psutil.Error:
+                    pass
+
+        if self.temporary:
+            shutil.rmtree(self.profile, ignore_errors=True)
+        self.context = None
+        self.process = None
+        self.rss = 0.0
+        return clean
+
+    async def recycle(self):
+        print(f'♻️ recycling browser context after {self.domains} domains '
+              f'({self.rss:.0f} MB, {self.leaked} pages not closed)')
+        await self.close()
+        await self.launch()
+
+
+# Force a page that refuses to close to go away by crashing its renderer.
+# Returns whether the page was closed.
+async def killPage(context: BrowserContext, page: Page) -> bool:
+    try:
+        session = await context.new_cdp_session(page)
+        await asyncio.wait_for(session.send('Page.crash'), timeout=PAGE_SLEEP)
+    except Exception as e:
+        # The renderer usually dies before it can respond
+        pass
+    try:
+        await asyncio.wait_for(page.close(), timeout=PAGE_SLEEP)
+        return True
+    except Exception as e:
+        return False
+
+
 # Process a domain.
-async def process_domain(context: BrowserContext, domain: str, pos: int):
+# Returns the time spent in each phase or None if the domain was skipped.
+async def process_domain(context: BrowserContext, domain: str, pos: int) -> Optional[dict]:
     # Skip domains in the blocklist.
     if domain in blocklist:
         print(f'[{pos}] ⚠️ Skipped blocked domain: {domain}')
-        return
+        return None
 
     # Sleep a short random time to distribute the load more evenly
     await asyncio.sleep(random.uniform(0.0, 1.5))
 
+    timing = {
+        'pos': pos,
+        'domain': domain,
+        'new_page': 0.0,
+        'goto': 0.0,
+        'dwell': 0.0,
+        'close': 0.0,
+        'timed_out': False,
+        'leaked': False,
+    }
+
     # Open a new tab
+    t = time.monotonic()
     page = await context.new_page()
     page.set_default_timeout(ACTION_TIMEOUT)
+    timing['new_page'] = time.monotonic() - t
 
     # Try to navigate to www subdomain
     uri = f'http://www.{domain}/'
+    t = time.monotonic()
     try:
         await asyncio.wait_for(page.goto(uri), timeout=FALLBACK_TIMEOUT)
+        timing['goto'] += time.monotonic() - t
         # Wait for page to finish loading + additional sleep time
+        t = time.monotonic()
         await asyncio.sleep(PAGE_SLEEP)
+        timing['dwell'] += time.monotonic() - t
     # As a fallback, try navigating to the domain without "www."
     except Exception as e:
+        timing['goto'] += time.monotonic() - t
         print(f'[{pos}] ⚠️ Error/Timeout while processing {uri}: {e}')
         sendToCollector({
             'uri': uri,
@@ -73,11 +321,19 @@ async def process_domain(context: BrowserContext, domain: str, pos: int):
 
         # try without 'www'
         uri = f'http://{domain}/'
+        t = time.monotonic()
         try:
             await asyncio.wait_for(page.goto(uri), timeout=FALLBACK_TIMEOUT)
+            timing['goto'] += time.monotonic() - t
             # print(await page.title())
+            t = time.monotonic()
             await asyncio.sleep(PAGE_SLEEP)
+            timing['dwell'] += time.monotonic() - t
         except Exception as e:
+            timing['goto'] += time.monotonic() - t
+            # Only the outcome of the last navigation counts as timeout
+            if isinstance(e, (asyncio.TimeoutError, PlaywrightTimeoutError)):
+                timing['timed_out'] = True
             print(f'[{pos}] ⚠️ Error/Timeout while processing {uri}: {e}')
             sendToCollector({
                 'uri': uri,
@@ -89,30 +345,102 @@ async def process_domain(context: BrowserContext, domain: str, pos: int):
                     'list': TRANCO_LIST_DATE,
                 }
             })
+    t = time.monotonic()
     try:
         await asyncio.wait_for(page.close(), timeout=PAGE_SLEEP)
     except Exception as e:
-        print(f'[{pos}] unable to close: {domain}')
+        print(f'[{pos}] unable to close, killing page: {domain}')
+        if not await killPage(context, page):
+            print(f'[{pos}] unable to kill page: {domain}')
+            timing['leaked'] = True
+    timing['close'] = time.monotonic() - t
     print(f'[{pos}] done: {domain}')
+    return timing
 
-# Process a batch of domains
-async def process_batch(context: BrowserContext, list: list[str], start: int, end: int):
-    try:
-        await asyncio.gather(
-            *[process_domain(context, list[pos], pos) for pos in range(start, end)]
-        )
-    except Exception as e:
-        print(f'[{start}:{end}] ⚠️ Timeout or error in process_batch: {e}')
-        sendToCollector({
-            'uri': f'internal:///List({TRANCO_LIST_DATE})[{start}:{end}]',
-            'status': -9,
-            'result': {
-                'error': e,
-                'start': start,
-                'end': end,
-                'list': TRANCO_LIST_DATE,
-            }
-        })
+# Process a range of domains.
+# The number of concurrently open tabs is determined by the controller.
+# The browser context is recycled once it processed enough domains or uses too much memory.
+async def process_range(session: BrowserSession, list: tranco_list.DomainList, start: int, end: int,
+                        controller: ConcurrencyController, timingwriter, memorywriter):
+    pending: dict[asyncio.Task, int] = {}
+    pos = start
+    finished = 0
+    started = time.monotonic()
+    last_sample = started
+    last_finished = 0
+    while pos < end or pending:
+        if session.needsRecycling():
+            # Drain the open tabs before replacing the context
+            if not pending:
+                await session.recycle()
+                continue
+        else:
+            # Fill up to the current concurrency limit
+            while pos < end and len(pending) < controller.limit:
+                task = asyncio.create_task(process_domain(session.context, list[pos], pos))
+                pending[task] = pos
+                session.domains += 1
+                pos += 1
+
+        timeout = max(0.0, last_sample + MEMORY_INTERVAL - time.monotonic())
+        done, _ = await asyncio.wait(pending.keys(), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            taskpos = pending.pop(task)
+            finished += 1
+            try:
+                timing = task.result()
+            except Exception as e:
+                print(f'[{taskpos}] ⚠️ Timeout or error in process_range: {e}')
+                sendToCollector({
+                    'uri': f'internal:///List({TRANCO_LIST_DATE})[{taskpos}]',
+                    'status': -9,
+                    'result': {
+                        'error': str(e),
+                        'start': taskpos,
+                        'end': taskpos+1,
+                        'list': TRANCO_LIST_DATE,
+                    }
+                })
+                continue
+
+            # Skipped domains do not say anything about the load
+            if timing is None:
+                continue
+
+            if timing['leaked']:
+                session.leaked += 1
+
+            controller.record(timing['timed_out'], timing['goto'])
+            timingwriter.writerow([
+                timing['pos'],
+                timing['domain'],
+                f"{timing['new_page']:.3f}",
+                f"{timing['goto']:.3f}",
+                f"{timing['dwell']:.3f}",
+                f"{timing['close']:.3f}",
+                int(timing['timed_out']),
+                controller.limit,
+            ])
+
+        # Record the memory usage of the browser over time
+        now = time.monotonic()
+        if now - last_sample >= MEMORY_INTERVAL:
+            (rss, renderer_rss, renderers) = session.memory()
+            memorywriter.writerow([
+                f'{now - started:.1f}',
+                finished,
+                session.domains,
+                len(pending),
+                controller.limit,
+                f'{rss:.1f}',
+                f'{renderer_rss:.1f}',
+                renderers,
+                f'{(finished - last_finished) / (now - last_sample) * 60:.1f}',
+            ])
+            last_sample = now
+            last_finished = finished
+
+        controller.adjust()
 
 
 # Send data to the data collection script.
@@ -125,42 +453,46 @@ def sendToCollector(payload):
 
 # Main initialization and loop.
 async def main(args):
-    # Get list of domains from https://tranco-list.eu/
-    tranco = Tranco(cache=True, cache_dir='.tranco')
-    list = tranco.list(date=TRANCO_LIST_DATE).list
+    # Get list of domains from https://tranco-list.eu/ or a local file
+    list = tranco_list.load(date=TRANCO_LIST_DATE, file_name=args.list)
+
+    browser_args = [
+        f"--disable-extensions-except={PATH_TO_EXTENSION}",
+        f"--load-extension={PATH_TO_EXTENSION}",
+        "--no-experiments",
+        "--no-pings",
+        "--no-default-browser-check"
+    ]
+    # Extensions are only supported by the new headless mode,
+    # which Playwright does not use when passing headless=True.
+    if args.headless:
+        browser_args.append("--headless=new")
+    browser_args += args.browser_arg
 
     async with async_playwright() as p:
-        context = await p.chromium.launch_persistent_context(
-            USER_DATA_DIR,
-            headless=False,
-            args=[
-                f"--disable-extensions-except={PATH_TO_EXTENSION}",
-                f"--load-extension={PATH_TO_EXTENSION}",
-                "--no-experiments",
-                "--no-pings",
-                "--no-default-browser-check"
-            ],
-        )
+        # The profile is configured in the paused run, every recycled context uses a fresh copy
+        session = BrowserSession(p, browser_args)
+        await session.launch(configure=args.pause)
 
         if args.pause:
             input("Press enter to start.")
 
-        totalDomains = NUM_DOMAINS - LIST_OFFSET
-        batches = floor(totalDomains/BATCH_SIZE)
-        for i in range(batches):
-            print(f'starting batch {i}...')
-            start = LIST_OFFSET + i*BATCH_SIZE
-            end = start + BATCH_SIZE
+        controller = ConcurrencyController(BATCH_SIZE, MIN_CONCURRENCY, MAX_CONCURRENCY)
 
-            await process_batch(context, list, start, end)
+        with open(TIMINGS_OUT, 'a', buffering=1) as file_timings, \
+             open(MEMORY_OUT, 'a', buffering=1) as file_memory:
+            timingwriter = csv.writer(file_timings)
+            memorywriter = csv.writer(file_memory)
 
-        rest = totalDomains - batches*BATCH_SIZE
-        if rest:
-            await process_batch(context, list, NUM_DOMAINS-rest, NUM_DOMAINS)
+            # Write headers if files are empty
+            if file_timings.tell() == 0:
+                timingwriter.writerow(['pos', 'domain', 'new_page', 'goto', 'dwell', 'close', 'timed_out', 'concurrency'])
+            if file_memory.tell() == 0:
+                memorywriter.writerow(['time', 'finished', 'context_domains', 'open_pages', 'concurrency', 'browser_rss', 'renderer_rss', 'renderers', 'domains_per_minute'])
 
-        try:
-            await asyncio.wait_for(context.close(), timeout=FALLBACK_TIMEOUT)
-        except Exception as e:
+            await process_range(session, list, LIST_OFFSET, NUM_DOMAINS, controller, timingwriter, memorywriter)
+
+        if not await session.close():
             exit('Unclean shutdown')
 
 if __name__ == "__main__":
@@ -169,18 +501,35 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument('-s', '--start', help="start list position", type=int, default=0)
     parser.add_argument('-e', '--end', help="end list position", type=int, default=0)
-    parser.add_argument('-b', '--batchsize', help="batch size", type=int, default=cpu_count()*2)
+    parser.add_argument('-b', '--batchsize', help="initial number of concurrent tabs", type=int, default=BATCH_SIZE)
+    parser.add_argument('--min-concurrency', help="minimum number of concurrent tabs", type=int, default=MIN_CONCURRENCY)
+    parser.add_argument('--max-concurrency', help="maximum number of concurrent tabs", type=int, default=MAX_CONCURRENCY)
+    parser.add_argument('-t', '--timings', help="timing telemetry output file", type=str, default=TIMINGS_OUT)
+    parser.add_argument('-m', '--memory', help="memory telemetry output file", type=str, default=MEMORY_OUT)
+    parser.add_argument('--recycle-domains', help="recycle the browser context after this many domains", type=int, default=RECYCLE_DOMAINS)
+    parser.add_argument('--recycle-rss', help="recycle the browser context above this memory usage in MB", type=int, default=RECYCLE_RSS)
     parser.add_argument('-p', '--pause', action=argparse.BooleanOptionalAction, default=False)
+    parser.add_argument('-l', '--list', help="local list file (rank,domain) instead of the Tranco list", type=str)
+    parser.add_argument('-x', '--extension', help="path to the extension", type=str, default=PATH_TO_EXTENSION)
+    parser.add_argument('--headless', action=argparse.BooleanOptionalAction, default=False)
+    parser.add_argument('--browser-arg', help="additional browser argument (repeatable)", action='append', default=[])
     args = parser.parse_args()
 
     # Overwrite values
     LIST_OFFSET = args.start
     NUM_DOMAINS = args.end
     BATCH_SIZE = args.batchsize
+    MIN_CONCURRENCY = args.min_concurrency
+    MAX_CONCURRENCY = args.max_concurrency
+    TIMINGS_OUT = args.timings
+    MEMORY_OUT = args.memory
+    RECYCLE_DOMAINS = args.recycle_domains
+    RECYCLE_RSS = args.recycle_rss
+    PATH_TO_EXTENSION = args.extension
 
     # Measure execution time and run main loop
     start = time.time()
     asyncio.run(main(args))
     totaltime = floor(time.time() - start)
     totalDomains = NUM_DOMAINS - LIST_OFFSET
-    print(f'Took {totaltime} seconds to process {totalDomains} domains in batches of {BATCH_SIZE}.')
+    print(f'Took {totaltime} seconds to process {totalDomains} domains with {MIN_CONCURRENCY}-{MAX_CONCURRENCY} concurrent tabs.')
@@ -0,0 +1,130 @@
+#!/bin/env python
+
+import csv
+import time
+import random
+import argparse
+from os import path
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Host and port of the HTTP server
+HOST = '127.0.0.1'
+PORT = 8090
+
+# Directory containing the example pages used as templates
+EXAMPLES_DIR = path.join(path.dirname(path.abspath(__file__)), '..', 'examples')
+
+# Ground truth generated by "benchmark.py" (rank,domain,kind)
+TRUTH_IN = 'bench_truth.csv'
+
+# Host that serves the external polyfill library
+POLYFILL_HOST = 'cdn.polyfill-bench.test'
+
+# Mean and jitter of the artificial response latency in seconds
+LATENCY = 0.0
+JITTER = 0.0
+# Share of requests that are dropped without a response
+FAILURE_RATE = 0.0
+
+# Template used for each kind of site
+TEMPLATES = {
+    'safe': 'safe.html',
+    'fetch': 'fetch-manipulation.html',
+    'property': 'property-manipulation.html',
+    'polyfill': 'external-polyfill.html',
+}
+
+# Shared variables
+kinds: dict[str, str] = {}
+pages: dict[str, bytes] = {}
+scripts: dict[str, bytes] = {}
+
+
+# Load the templates and rewrite references to the internet to local hosts.
+def loadTemplates():
+    for kind, filename in TEMPLATES.items():
+        with open(path.join(EXAMPLES_DIR, filename), 'r') as file:
+            html = file.read()
+        html = html.replace('https://polyfill.io/', f'http://{POLYFILL_HOST}/')
+        pages[kind] = html.encode()
+
+    for filename in ['overwrite.js', 'safe.js']:
+        with open(path.join(EXAMPLES_DIR, filename), 'r') as file:
+            scripts['/'+filename] = file.read().encode()
+
+    # The polyfill overwrites fetch, just like polyfill.io does with the 'always' flag.
+    scripts['polyfill'] = scripts['/overwrite.js'] + b'\nwindow.overwrite.fetch();\n'
+
+
+# Load the kind of each synthetic site.
+def loadTruth(filename: str):
+    with open(filename, 'r') as file:
+        csvreader = csv.reader(file)
+
+        # Skip header
+        next(csvreader, None)
+
+        for (rank, domain, kind) in csvreader:
+            kinds[domain] = kind
+
+
+class SiteHandler(BaseHTTPRequestHandler):
+    # Keep the console quiet, the crawler already logs every domain
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        # Simulate network and server latency
+        if LATENCY or JITTER:
+            time.sleep(max(0.0, random.gauss(LATENCY, JITTER)))
+
+        hostname = (self.headers.get('Host') or '').split(':')[0].lower()
+        domain = hostname.removeprefix('www.')
+        kind = kinds.get(domain, 'safe')
+        urlpath = self.path.split('?')[0]
+
+        # Drop the connection to simulate unreachable sites
+        if kind == 'broken' or random.random() < FAILURE_RATE:
+            self.close_connection = True
+            return
+
+        if hostname == POLYFILL_HOST:
+            self.respond(200, 'text/javascript', scripts['polyfill'])
+        elif urlpath in scripts:
+            self.respond(200, 'text/javascript', scripts[urlpath])
+        elif urlpath in ['/', '/index.html']:
+            self.respond(200, 'text/html; charset=utf-8', pages[kind])
+        else:
+            self.respond(404, 'text/plain', b'not found')
+
+    def respond(self, code: int, contenttype: str, body: bytes):
+        self.send_response(code)
+        self.send_header('Content-Type', contenttype)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+if __name__ == '__main__':
+
+    # Parse arguments
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-t', '--truth', help="ground truth file (rank,domain,kind)", type=str, default=TRUTH_IN)
+    parser.add_argument('--host', help="host of the HTTP server", type=str, default=HOST)
+    parser.add_argument('--port', help="port of the HTTP server", type=int, default=PORT)
+    parser.add_argument('--latency', help="mean response latency in seconds", type=float, default=LATENCY)
+    parser.add_argument('--jitter', help="standard deviation of the latency in seconds", type=float, default=JITTER)
+    parser.add_argument('--failure-rate', help="share of requests that are dropped", type=float, default=FAILURE_RATE)
+    args = parser.parse_args()
+
+    LATENCY = args.latency
+    JITTER = args.jitter
+    FAILURE_RATE = args.failure_rate
+
+    loadTemplates()
+    loadTruth(args.truth)
+
+    server = ThreadingHTTPServer((args.host, args.port), SiteHandler)
+    server.daemon_threads = True
+    print(f'Serving {len(kinds)} synthetic sites on {args.host}:{args.port}')
+    server.serve_forever()
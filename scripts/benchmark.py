@@ -0,0 +1,273 @@
+#!/bin/env python
+
+import csv
+import json
+import time
+import random
+import socket
+import argparse
+import requests
+import subprocess
+from os import path, remove
+from sys import executable, exit
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+
+# Root directory of this script
+ROOT = path.dirname(path.abspath(__file__))
+
+# Number of synthetic sites
+NUM_DOMAINS = 200
+# Share of sites of each kind
+KIND_WEIGHTS = {
+    'safe': 0.4,
+    'fetch': 0.2,
+    'property': 0.2,
+    'polyfill': 0.2,
+}
+
+# Host and port of the synthetic site server
+SERVER_HOST = '127.0.0.1'
+SERVER_PORT = 8090
+# Host and port of the data collector, which must match the endpoint configured
+# in the extension (http://127.0.0.1:8082/collect by default). The host is
+# excluded from the resolver rules, otherwise the results would be sent to the site server.
+COLLECTOR_HOST = '127.0.0.1'
+COLLECTOR_PORT = 8082
+
+# Files generated by this script
+BENCH_BASENAME = 'bench'
+LIST_OUT = BENCH_BASENAME+'_list.csv'
+TRUTH_OUT = BENCH_BASENAME+'_truth.csv'
+DATA_OUT = BENCH_BASENAME+'_data.csv'
+TIMINGS_OUT = BENCH_BASENAME+'_timings.csv'
+MEMORY_OUT = BENCH_BASENAME+'_memory.csv'
+REPORT_OUT = BENCH_BASENAME+'_report.json'
+
+# Status expected from the extension for each kind of site
+EXPECTED_STATUS = {
+    'broken': -1,
+    'safe': 0,
+    'fetch': 1,
+    'property': 1,
+    'polyfill': 1,
+}
+
+
+# Generate a synthetic ranked list and the ground truth for each site.
+def generateList(num: int, failure_rate: float, seed: int) -> dict[str, str]:
+    rng = random.Random(seed)
+    truth = {}
+
+    with open(LIST_OUT, 'w') as file_list, open(TRUTH_OUT, 'w') as file_truth:
+        listwriter = csv.writer(file_list)
+        truthwriter = csv.writer(file_truth)
+        truthwriter.writerow(['rank', 'domain', 'kind'])
+
+        for rank in range(1, num+1):
+            domain = f'site-{rank:06d}.test'
+            if rng.random() < failure_rate:
+                kind = 'broken'
+            else:
+                kind = rng.choices(list(KIND_WEIGHTS.keys()), weights=KIND_WEIGHTS.values())[0]
+            truth[domain] = kind
+
+            listwriter.writerow([rank, domain])
+            truthwriter.writerow([rank, domain, kind])
+
+    return truth
+
+
+# Wait until a TCP port accepts connections.
+def waitForPort(host: str, port: int, timeout: float = 15.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=1.0):
+                return
+        except OSError:
+            time.sleep(0.1)
+    exit(f'Timeout while waiting for {host}:{port}')
+
+
+# Count the data rows written by the collector.
+def countRows(filename: str) -> int:
+    if not path.exists(filename):
+        return 0
+    with open(filename, 'r') as file:
+        return max(0, sum(1 for _ in csv.reader(file)) - 1)
+
+
+# Send synthetic results to the collector as fast as possible.
+# Returns the number of rows per second.
+def stressCollector(num: int, workers: int) -> float:
+    api = f'http://{COLLECTOR_HOST}:{COLLECTOR_PORT}/collect'
+    payload = {
+        'uri': 'internal:///benchmark',
+        'status': 0,
+        'result': {'refMissmatches': [], 'funcMissmatches': [], 'flags': []},
+    }
+
+    def send(_):
+        requests.post(api, json=payload)
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(send, range(num)))
+    return num / (time.monotonic() - start)
+
+
+# Compare the collected data with the ground truth.
+def evaluate(truth: dict[str, str]) -> dict:
+    observed = {domain: -1 for domain in truth}
+    polyfills = set()
+
+    with open(DATA_OUT, 'r') as file:
+        csvreader = csv.reader(file)
+
+        # Skip header
+        next(csvreader, None)
+
+        for (url, status_str, data) in csvreader:
+            hostname = urlparse(url).hostname
+            if hostname is None:
+                continue
+            domain = hostname.removeprefix('www.')
+            if domain not in truth:
+                continue
+
+            status = int(status_str)
+            if status == 2:
+                polyfills.add(domain)
+            # Store the highest status smaller than 2
+            elif status < 2 and observed[domain] < status:
+                observed[domain] = status
+
+    correct = sum(1 for domain, kind in truth.items() if observed[domain] == EXPECTED_STATUS[kind])
+    polyfill_sites = [domain for domain, kind in truth.items() if kind == 'polyfill']
+    confusion = {}
+    for domain, kind in truth.items():
+        key = f'{kind}:{observed[domain]}'
+        confusion[key] = confusion.get(key, 0) + 1
+
+    return {
+        'accuracy': correct / len(truth),
+        'polyfill_recall': len(polyfills.intersection(polyfill_sites)) / len(polyfill_sites) if polyfill_sites else None,
+        'confusion': dict(sorted(confusion.items())),
+    }
+
+
+def main(args):
+    truth = generateList(args.num, args.failure_rate, args.seed)
+    print(f'Generated {len(truth)} synthetic sites: {LIST_OUT} {TRUTH_OUT}')
+
+    # Start with a fresh data file
+    for filename in [DATA_OUT, TIMINGS_OUT, MEMORY_OUT]:
+        if path.exists(filename):
+            remove(filename)
+
+    server = subprocess.Popen([
+        executable, path.join(ROOT, 'benchmark-server.py'),
+        '--truth', TRUTH_OUT,
+        '--host', SERVER_HOST,
+        '--port', str(SERVER_PORT),
+        '--latency', str(args.latency),
+        '--jitter', str(args.jitter),
+        '--failure-rate', str(args.request_failure_rate),
+    ])
+    collector = subprocess.Popen([
+        executable, path.join(ROOT, 'data-collector.py'),
+        '--output', DATA_OUT,
+        '--host', COLLECTOR_HOST,
+        '--port', str(COLLECTOR_PORT),
+    ], stdout=subprocess.DEVNULL)
+
+    report = {'domains': len(truth)}
+    try:
+        waitForPort(SERVER_HOST, SERVER_PORT)
+        waitForPort(COLLECTOR_HOST, COLLECTOR_PORT)
+
+        if args.collector_requests:
+            report['collector_stress_rows_per_second'] = stressCollector(args.collector_requests, args.collector_workers)
+        rows_before = countRows(DATA_OUT)
+
+        evaluator = [
+            executable, path.join(ROOT, 'auto-evaluator.py'),
+            '--start', '0',
+            '--end', str(len(truth)),
+            '--list', LIST_OUT,
+            '--timings', TIMINGS_OUT,
+            '--memory', MEMORY_OUT,
+            # Resolve every hostname to the synthetic site server, except for the collector
+            '--browser-arg', f'--host-resolver-rules=MAP * {SERVER_HOST}:{SERVER_PORT}, EXCLUDE {COLLECTOR_HOST}, EXCLUDE localhost',
+        ]
+        if args.extension:
+            evaluator += ['--extension', args.extension]
+        if args.batchsize:
+            evaluator += ['--batchsize', str(args.batchsize)]
+        if args.headless:
+            evaluator.append('--headless')
+
+        start = time.monotonic()
+        subprocess.run(evaluator, check=True)
+        crawltime = time.monotonic() - start
+
+        # Give the extension time to deliver the last results
+        time.sleep(args.drain)
+
+        rows = countRows(DATA_OUT) - rows_before
+        report['crawl_seconds'] = crawltime
+        report['domains_per_minute'] = len(truth) / crawltime * 60
+        report['collector_rows'] = rows
+        report['collector_rows_per_second'] = rows / crawltime
+        report.update(evaluate(truth))
+    finally:
+        server.terminate()
+        collector.terminate()
+        server.wait()
+        collector.wait()
+
+    with open(REPORT_OUT, 'w') as file:
+        json.dump(report, file, indent=2)
+
+    print("")
+    print(f"Domains/minute: {report['domains_per_minute']:.1f}")
+    print(f"Collector rows/s: {report['collector_rows_per_second']:.1f} during the crawl")
+    if 'collector_stress_rows_per_second' in report:
+        print(f"Collector rows/s: {report['collector_stress_rows_per_second']:.1f} under load")
+    print(f"Detection accuracy: {report['accuracy']:.2%}")
+    if report['polyfill_recall'] is not None:
+        print(f"External polyfill recall: {report['polyfill_recall']:.2%}")
+    print(f"Confusion (kind:status): {json.dumps(report['confusion'])}")
+    print("")
+    print(f"Generated the following files: {LIST_OUT} {TRUTH_OUT} {DATA_OUT} {TIMINGS_OUT} {MEMORY_OUT} {REPORT_OUT}")
+
+
+if __name__ == "__main__":
+
+    # Parse arguments
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', '--num', help="number of synthetic sites", type=int, default=NUM_DOMAINS)
+    parser.add_argument('-x', '--extension', help="path to the extension", type=str)
+    parser.add_argument('-b', '--batchsize', help="initial number of concurrent tabs", type=int)
+    parser.add_argument('--headless', action=argparse.BooleanOptionalAction, default=True)
+    parser.add_argument('--latency', help="mean response latency in seconds", type=float, default=0.2)
+    parser.add_argument('--jitter', help="standard deviation of the latency in seconds", type=float, default=0.1)
+    parser.add_argument('--failure-rate', help="share of sites that are unreachable", type=float, default=0.05)
+    parser.add_argument('--request-failure-rate', help="share of requests that are dropped", type=float, default=0.0)
+    parser.add_argument('--collector-requests', help="number of requests sent to stress the collector", type=int, default=1000)
+    parser.add_argument('--collector-workers', help="number of concurrent collector requests", type=int, default=16)
+    parser.add_argument('--drain', help="seconds to wait for late results", type=float, default=3.0)
+    parser.add_argument('--seed', help="seed of the synthetic list", type=int, default=0)
+    parser.add_argument('-o', '--output', help="output file basename", type=str, default=BENCH_BASENAME)
+    args = parser.parse_args()
+
+    BENCH_BASENAME = args.output
+    LIST_OUT = BENCH_BASENAME+'_list.csv'
+    TRUTH_OUT = BENCH_BASENAME+'_truth.csv'
+    DATA_OUT = BENCH_BASENAME+'_data.csv'
+    TIMINGS_OUT = BENCH_BASENAME+'_timings.csv'
+    MEMORY_OUT = BENCH_BASENAME+'_memory.csv'
+    REPORT_OUT = BENCH_BASENAME+'_report.json'
+
+    main(args)
@@ -2,6 +2,7 @@
 
 from flask import Flask, request, jsonify, json
 import csv
+import argparse
 
 # Output file
 DATA_OUT = 'data.csv'
@@ -47,6 +48,18 @@ def post_collect():
     return jsonify(success=True), 200
 
 if __name__ == '__main__':
+
+    # Parse arguments
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-o', '--output', help="data output file", type=str, default=DATA_OUT)
+    parser.add_argument('--host', help="host of the API server", type=str, default=HOST)
+    parser.add_argument('--port', help="port of the API server", type=int, default=PORT)
+    args = parser.parse_args()
+
+    DATA_OUT = args.output
+    HOST = args.host
+    PORT = args.port
+
     with open(DATA_OUT, 'a') as file:
         csvfile = file
         csvwriter = csv.writer(csvfile)
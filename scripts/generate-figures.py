@@ -1,22 +1,121 @@
 #!/bin/env python
 
+import csv
+import ctypes
+import json
+import hashlib
 import argparse
+from os import path
+from sys import exit
 import matplotlib.pyplot as plt
 import plot_utils as pu
 
-total = 16000
-successfull = 13134
-unsuccessfull = total-successfull
-https = 12047
-modified = 8091
-unmodified = successfull-modified
-corejs = 5661
-externalmod = 7020
-externalpoly = 671
+# Data file generated by "process-data.py"
+DATA_IN = 'data_summary.json'
+
+# Cache of aggregates and rendered figures
+CACHE_FILE = '.figure-cache.json'
+
+# Format of figures that are saved automatically
+FIGURE_FORMAT = 'pdf'
+
+# Aggregates every figure is based on
+AGGREGATE_KEYS = [
+    'total',
+    'successful',
+    'failed',
+    'unmodified',
+    'modified',
+    'https',
+    'corejs',
+    'external_polyfill',
+    'external_manipulation',
+]
+
+# Files that affect the look of every figure
+SOURCES = [path.abspath(__file__), path.abspath(pu.__file__)]
 
 pre=r'\begin{center}'
 post=r'\end{center}'
 
+
+# Returns the SHA-256 hash of the given files.
+def hashFiles(filenames: list[str]) -> str:
+    h = hashlib.sha256()
+    for filename in filenames:
+        with open(filename, 'rb') as file:
+            while chunk := file.read(2**20):
+                h.update(chunk)
+    return h.hexdigest()
+
+# Compute the aggregates from a "_processed.csv" file.
+def aggregateProcessed(filename: str) -> dict:
+    # Increase the CSV field size limit
+    # https://stackoverflow.com/a/54517228/4884643
+    csv.field_size_limit(int(ctypes.c_ulong(-1).value // 2))
+
+    a = {key: 0 for key in AGGREGATE_KEYS}
+    with open(filename, 'r') as file:
+        csvreader = csv.DictReader(file)
+
+        # Files written before the flags column was added lack the core-js flag
+        if 'flags' not in (csvreader.fieldnames or []):
+            exit(f'{filename} has no flags column, run "process-data.py" again to regenerate it')
+
+        for row in csvreader:
+            a['total'] += 1
+            status = int(row['status'])
+            if status < 0:
+                a['failed'] += 1
+                continue
+
+            a['successful'] += 1
+            a['modified' if status == 1 else 'unmodified'] += 1
+            a['https'] += row['https'] == 'True'
+            a['external_polyfill'] += row['external_polyfill'] == 'True'
+            a['external_manipulation'] += row['external_manipulation'] == 'True'
+            a['corejs'] += 'core-js' in json.loads(row['flags'])
+    return a
+
+# Returns the aggregates of a summary or processed file.
+# Aggregates are cached by the hash of the input file and of the code computing them.
+def loadAggregates(filename: str, sources: str, cache: dict) -> tuple[dict, str]:
+    key = f'{hashFiles([filename])}:{sources}'
+    if key not in cache['aggregates']:
+        if filename.endswith('.json'):
+            with open(filename, 'r') as file:
+                aggregates = json.load(file)
+
+            # Reject other JSON files, eg. a "_diff_summary.json"
+            missing = [k for k in AGGREGATE_KEYS if not isinstance(aggregates, dict) or k not in aggregates]
+            if missing:
+                exit(f'{filename} is not a summary generated by "process-data.py", missing: {", ".join(missing)}')
+        else:
+            aggregates = aggregateProcessed(filename)
+
+        # The figures are relative to the number of successful results
+        if aggregates['successful'] == 0:
+            exit(f'{filename} contains no successful results')
+        cache['aggregates'][key] = aggregates
+    return (cache['aggregates'][key], key)
+
+def loadCache() -> dict:
+    if path.exists(CACHE_FILE):
+        with open(CACHE_FILE, 'r') as file:
+            return json.load(file)
+    return {'aggregates': {}, 'figures': {}}
+
+def saveCache(cache: dict):
+    with open(CACHE_FILE, 'w') as file:
+        json.dump(cache, file, indent=2)
+
+# Returns the file name of a figure generated from the given input.
+def figureName(filename: str, name: str, fmt: str) -> str:
+    basename = path.splitext(filename)[0]
+    for suffix in ['_summary', '_processed']:
+        basename = basename.removesuffix(suffix)
+    return f'{basename}-{name}.{fmt}'
+
 def make_autopct(values):
     def my_autopct(pct):
         total = sum(values)
@@ -24,8 +123,11 @@ def make_autopct(values):
         return pre+f'{pct:.2f}\\%\\\\({val:d})'+post
     return my_autopct
 
-def main(args):
-    pu.figure_setup()
+# Overview of the results: pie chart of successful results and bar chart of findings.
+def plotOverview(a: dict):
+    total = a['total']
+    successfull = a['successful']
+    unsuccessfull = total-successfull
 
     # make figure and assign axis objects
     fig, (ax1, ax2) = plt.subplots(1, 2,
@@ -50,11 +152,11 @@ def main(args):
         pre+r'External\\Polyfill'+post,
     ]
     bValues = [
-        https/successfull*100,
-        modified/successfull*100,
-        externalmod/successfull*100,
-        corejs/successfull*100,
-        externalpoly/successfull*100,
+        a['https']/successfull*100,
+        a['modified']/successfull*100,
+        a['external_manipulation']/successfull*100,
+        a['corejs']/successfull*100,
+        a['external_polyfill']/successfull*100,
     ]
     width = 0.45
 
@@ -69,22 +171,76 @@ def main(args):
         height = bar.get_height()
         x, y = bar.get_xy()
         value = bValues[i]
-        plt.text(x+width/2,
+        ax2.text(x+width/2,
                 y+height + 1,
                 f'{value:.2f}\\%',
                 ha='center')
         i+=1
 
-    if args.save:
-        pu.save_fig(fig, args.save)
-    else:
-        plt.show()
+    return fig
+
+# Figures generated for each input
+FIGURES = {
+    'overview': plotOverview,
+}
+
+def main(args):
+    pu.figure_setup()
+    cache = loadCache()
+    sources = hashFiles(SOURCES)
+
+    # Drop aggregates computed by an older version of the code
+    cache['aggregates'] = {key: a for key, a in cache['aggregates'].items() if key.endswith(':'+sources)}
+
+    # Save figures unless a single input should be shown
+    save = args.save or args.format or len(args.input) > 1
+    fmt = args.format or FIGURE_FORMAT
+
+    jobs = []
+    stamps = {}
+    for filename in args.input:
+        (aggregates, key) = loadAggregates(filename, sources, cache)
+
+        for name, plot in FIGURES.items():
+            if not save:
+                plot(aggregates)
+                plt.show()
+                continue
+
+            if args.save and len(args.input) == 1 and len(FIGURES) == 1:
+                outname = args.save
+            else:
+                outname = figureName(filename, name, fmt)
+
+            # Only render figures whose inputs changed, the key includes the hash of the sources
+            if not args.force and path.exists(outname) and cache['figures'].get(outname) == key:
+                print(f'Up to date: {outname}')
+                continue
+
+            jobs.append((plot, (aggregates,), outname))
+            stamps[outname] = key
+
+    # Render all figures in parallel
+    pu.render_figs(jobs, args.jobs)
+    for outname, stamp in stamps.items():
+        cache['figures'][outname] = stamp
+        print(f'Generated: {outname}')
+
+    saveCache(cache)
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
 
+    # eg. 'data_summary.json' or 'data_processed.csv' generated by "process-data.py"
+    parser.add_argument('input', nargs='*', default=[DATA_IN])
     # eg. 'evaluation-overview.pdf'
     parser.add_argument('-s', '--save', type=str)
+    # Save all figures as '<input basename>-<figure>.<format>'
+    parser.add_argument('-f', '--format', type=str, choices=['eps', 'png', 'pdf'])
+    # Number of processes used for rendering
+    parser.add_argument('-j', '--jobs', type=int)
+    # Render figures even if their inputs did not change
+    parser.add_argument('--force', action=argparse.BooleanOptionalAction, default=False)
 
     args = parser.parse_args()
     main(args)
@@ -1,8 +1,8 @@
 import math
+import matplotlib
 import matplotlib.pyplot as plt
 import os
-import subprocess
-import tempfile
+from concurrent.futures import ProcessPoolExecutor
 
 
 def get_fig_size(fig_width_cm, fig_height_cm=None):
@@ -77,7 +77,9 @@ def figure_setup():
 
 
 def save_fig(fig, file_name, fmt=None, dpi=300, tight=True):
-    """Save a Matplotlib figure as EPS/PNG/PDF to the given path and trim it.
+    """Save a Matplotlib figure as EPS/PNG/PDF to the given path.
+    If tight is set, the figure is trimmed to its tight bounding box while saving,
+    otherwise it is saved untrimmed at its full size.
     """
 
     if not fmt:
@@ -91,21 +93,43 @@ def save_fig(fig, file_name, fmt=None, dpi=300, tight=True):
         file_name += extension
 
     file_name = os.path.abspath(file_name)
-    with tempfile.NamedTemporaryFile() as tmp_file:
-        tmp_name = tmp_file.name + extension
 
-    # save figure
+    # save figure, trimmed to its content if tight
     if tight:
-        fig.savefig(tmp_name, dpi=dpi, bbox_inches='tight')
+        fig.savefig(file_name, format=fmt, dpi=dpi, bbox_inches='tight', pad_inches=0)
     else:
-        fig.savefig(tmp_name, dpi=dpi)
-
-    # trim it
-    if fmt == 'eps':
-        subprocess.call('epstool --bbox --copy %s %s' %
-                        (tmp_name, file_name), shell=True)
-    elif fmt == 'png':
-        subprocess.call('convert %s -trim %s' %
-                        (tmp_name, file_name), shell=True)
-    elif fmt == 'pdf':
-        subprocess.call('pdfcrop %s %s' % (tmp_name, file_name), shell=True)
+        fig.savefig(file_name, format=fmt, dpi=dpi)
+
+    return file_name
+
+
+def _init_worker():
+    """Prepare a worker process for rendering figures.
+    """
+    matplotlib.use('Agg')
+    figure_setup()
+
+
+def _render(job):
+    """Render a single figure and save it.
+    """
+    plot, args, file_name = job
+    fig = plot(*args)
+    file_name = save_fig(fig, file_name)
+    plt.close(fig)
+    return file_name
+
+
+def render_figs(jobs, processes=None):
+    """Render many figures in a process pool.
+
+    Each job is a tuple (plot, args, file_name), where plot is a module level
+    function that returns a Matplotlib figure when called with args.
+    Returns the paths of the saved figures in the order of the jobs.
+    """
+    if not jobs:
+        return []
+
+    processes = min(processes or os.cpu_count(), len(jobs))
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker) as executor:
+        return list(executor.map(_render, jobs))
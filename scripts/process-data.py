@@ -6,10 +6,14 @@ import ctypes
 import json
 import re
 import argparse
+import cProfile
 from os import path
+from contextlib import contextmanager
+from sys import exit
 from typing import Optional
 from math import floor
-from tranco import Tranco
+import tranco_list
+import rank_index
 from urllib.parse import urlparse
 from tld import get_fld
 
@@ -29,6 +33,20 @@ DATA_OUT_PDS = DATA_BASENAME+"_pds.csv"
 DATA_OUT_MDS = DATA_BASENAME+"_mds.csv"
 DATA_OUT_RK = DATA_BASENAME+"_rk.csv"
 DATA_OUT_FK = DATA_BASENAME+"_fk.csv"
+DATA_OUT_SUMMARY = DATA_BASENAME+"_summary.json"
+DATA_OUT_INDEX = DATA_BASENAME+"_index.bin"
+DATA_OUT_PROFILE = DATA_BASENAME+"_profile.json"
+
+# Files generated by the diff mode
+DIFF_BASENAME = DATA_BASENAME+"_diff"
+DIFF_OUT_STATUS = DIFF_BASENAME+"_status.csv"
+DIFF_OUT_EXTERNAL = DIFF_BASENAME+"_external.csv"
+DIFF_OUT_KEYS = DIFF_BASENAME+"_keys.csv"
+DIFF_OUT_UNMATCHED = DIFF_BASENAME+"_unmatched.csv"
+DIFF_OUT_SUMMARY = DIFF_BASENAME+"_summary.json"
+
+# Columns of the processed file, all of them are required by the diff mode
+PROCESSED_COLUMNS = ['rank', 'domain', 'status', 'external_polyfill', 'external_manipulation', 'https', 'polyfill_domains', 'manipulation_domains', 'flags', 'ref_missmatches', 'func_missmatches']
 
 # Stack Trace RegEx
 RE_TRACE = r"at (?:[\w.]+ \()?(https?:\/\/+[^\/\s:]+)"
@@ -39,6 +57,80 @@ matches_2 = 0
 non_matches = 0
 
 
+# Measures the time spent in each phase of the processing (see --profile).
+# Phases can be nested; the self time of a phase excludes nested phases.
+class PhaseProfiler():
+    def __init__(self):
+        # Number of times each phase was entered
+        self.counts: dict[str, int] = {}
+        # Cumulative time of each phase including nested phases
+        self.total: dict[str, float] = {}
+        # Cumulative time of each phase excluding nested phases
+        self.own: dict[str, float] = {}
+        # Active phases: name, start time, time spent in nested phases
+        self.stack: list[list] = []
+
+    def enter(self, name: str):
+        self.stack.append([name, time.perf_counter(), 0.0])
+
+    def exit(self):
+        name, start, nested = self.stack.pop()
+        elapsed = time.perf_counter() - start
+        self.counts[name] = self.counts.get(name, 0) + 1
+        self.total[name] = self.total.get(name, 0.0) + elapsed
+        self.own[name] = self.own.get(name, 0.0) + elapsed - nested
+        if self.stack:
+            self.stack[-1][2] += elapsed
+
+    @contextmanager
+    def phase(self, name: str):
+        self.enter(name)
+        try:
+            yield
+        finally:
+            self.exit()
+
+    # Returns a function that measures every call of fn as the given phase.
+    def wrap(self, name: str, fn):
+        def wrapper(*args, **kwargs):
+            self.enter(name)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.exit()
+        return wrapper
+
+    # Measures the time spent fetching each item of an iterable as the given phase.
+    def iterate(self, name: str, iterable):
+        iterator = iter(iterable)
+        while True:
+            self.enter(name)
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self.exit()
+            yield item
+
+    def report(self, wall: float) -> dict:
+        phases = sorted(self.total, key=lambda name: self.own[name], reverse=True)
+        return {
+            'wall': wall,
+            'phases': {name: {
+                'count': self.counts[name],
+                'total': self.total[name],
+                'self': self.own[name],
+                'percent': percentof(self.own[name], wall) if wall else 0.0,
+            } for name in phases},
+        }
+
+profiler = PhaseProfiler()
+
+# Decodes the JSON data of a row (measured separately when profiling).
+decodeJSON = json.loads
+
+
 class ResultItem():
     def __init__(self, rank, domain):
         # Rank of the domain in the lis
@@ -76,8 +168,27 @@ class ResultItem():
             self.https,
             json.dumps(list(self.polyfill_domains)),
             json.dumps(list(self.manipulation_domains)),
+            json.dumps(list(self.flags)),
+            json.dumps(list(self.refMissmatches)),
+            json.dumps(list(self.funcMissmatches)),
         )
 
+    # Returns the terms under which the result is stored in the inverted index
+    def terms(self) -> list[str]:
+        terms = [f"status:{self.status}"]
+        if self.https:
+            terms.append("is:https")
+        if self.external_polyfill:
+            terms.append("is:external_polyfill")
+        if self.external_manipulation:
+            terms.append("is:external_manipulation")
+        terms += ["ref:"+key for key in self.refMissmatches]
+        terms += ["func:"+key for key in self.funcMissmatches]
+        terms += ["flag:"+flag for flag in self.flags]
+        terms += ["polyfill:"+domain for domain in self.polyfill_domains]
+        terms += ["manipulation:"+domain for domain in self.manipulation_domains]
+        return terms
+
 # store the results
 results: list[ResultItem] = []
 
@@ -95,7 +206,7 @@ def get_eSLD(url: str) -> str:
             return url
 
 # Returns the position of a hostname in a given list.
-def getPos(list: list[str], hostname: Optional[str]) -> int:
+def getPos(list: tranco_list.DomainList, hostname: Optional[str]) -> int:
     global matches_1
     global matches_2
     global non_matches
@@ -107,18 +218,21 @@ def getPos(list: list[str], hostname: Optional[str]) -> int:
     eSLD = get_eSLD(hostname)
 
     # Look for direct matches or matches without the 'www.' prefix
-    matches = [pos for pos in range(NUM_DOMAINS) if list[pos] == hostname or list[pos] == eSLD]
+    candidates = [hostname, eSLD] if eSLD else [hostname]
+    matches = [pos for pos in map(list.pos, candidates) if 0 <= pos < NUM_DOMAINS]
     if len(matches) != 0:
-        #print(f"Matched#1 '{hostname}' to '{list[matches[0]]}' at pos {matches[0]}")
+        #print(f"Matched#1 '{hostname}' to '{list[min(matches)]}' at pos {min(matches)}")
         matches_1 += 1
-        return matches[0]
+        return min(matches)
 
     # Check if the hostname is a subdomain
-    matches = [pos for pos in range(NUM_DOMAINS) if hostname.endswith("." + list[pos])]
+    labels = hostname.split(".")
+    parents = [".".join(labels[i:]) for i in range(1, len(labels))]
+    matches = [pos for pos in map(list.pos, parents) if 0 <= pos < NUM_DOMAINS]
     if len(matches) != 0:
-        #print(f"Matched#2 '{hostname}' to '{list[matches[0]]}' at pos {matches[0]}")
+        #print(f"Matched#2 '{hostname}' to '{list[min(matches)]}' at pos {min(matches)}")
         matches_2 += 1
-        return matches[0]
+        return min(matches)
 
     # No match
     #print(f"Unable to find the position of hostname: {hostname}")
@@ -129,7 +243,7 @@ def percentof(value: int, total: int) -> float:
     return round(value/total * 100, 2)
 
 def processData(pos: int, data: str):
-    d = json.loads(data)
+    d = decodeJSON(data)
 
     # Add keys to set
     for key in d['refMissmatches']:
@@ -164,7 +278,7 @@ def extractDomainsFromTrace(trace: str) -> set[str]:
     return domains
 
 def processStackTraceData(pos: int, data: str):
-    d = json.loads(data)
+    d = decodeJSON(data)
 
     # Extract domains
     domains = extractDomainsFromTrace(d['stack'])
@@ -188,14 +302,171 @@ def processStackTraceData(pos: int, data: str):
     for key in d['keys']:
         results[pos].manipulation_keymap[key] = domain[0]
 
+# Returns the set stored as JSON list in a column of a processed row.
+def decodeSet(row: dict, column: str) -> set[str]:
+    return set(json.loads(row[column]))
+
+# Reject processed files written by an older version that lack some of the columns,
+# missing columns would show up as differences.
+def checkColumns(filename: str):
+    with open(filename, 'r') as file:
+        fieldnames = next(csv.reader(file), [])
+    missing = [column for column in PROCESSED_COLUMNS if column not in fieldnames]
+    if missing:
+        exit(f'{filename} lacks the columns {", ".join(missing)}, run "process-data.py" again to regenerate it')
+
+# Returns the next row of a processed file with its rank, or None at the end.
+# The merge-join requires strictly increasing ranks, so unordered files are rejected.
+def nextRow(csvreader, filename: str, previous: Optional[tuple[int, dict]] = None) -> Optional[tuple[int, dict]]:
+    row = next(csvreader, None)
+    if row is None:
+        return None
+    rank = int(row['rank'])
+    if previous is not None and rank <= previous[0]:
+        exit(f'{filename} is not ordered by rank (rank {rank} after {previous[0]}), run "process-data.py" again to regenerate it')
+    return (rank, row)
+
+# Count the properties of a processed row.
+def countRow(counter: dict, row: dict):
+    status = int(row['status'])
+    counter[f'status:{status}'] = counter.get(f'status:{status}', 0) + 1
+    if status < 0:
+        return
+    for column in ['https', 'external_polyfill', 'external_manipulation']:
+        if row[column] == 'True':
+            counter[column] = counter.get(column, 0) + 1
+    if 'core-js' in decodeSet(row, 'flags'):
+        counter['corejs'] = counter.get('corejs', 0) + 1
+
+# Compare two "_processed.csv" files of the same list.
+# Both files are ordered by rank, so they are merge-joined on the rank
+# while streaming, which keeps the memory usage constant.
+def diffResults(old_name: str, new_name: str):
+    # Increase the CSV field size limit
+    # https://stackoverflow.com/a/54517228/4884643
+    csv.field_size_limit(int(ctypes.c_ulong(-1).value // 2))
+
+    checkColumns(old_name)
+    checkColumns(new_name)
+
+    counts_old = {}
+    counts_new = {}
+    changes = {
+        'matched': 0,
+        'unmatched': 0,
+        'only_old': 0,
+        'only_new': 0,
+        'status': 0,
+        'external': 0,
+        'keys': 0,
+    }
+
+    with open(old_name, 'r') as file_old, \
+         open(new_name, 'r') as file_new, \
+         open(DIFF_OUT_STATUS, 'w') as file_out_status, \
+         open(DIFF_OUT_EXTERNAL, 'w') as file_out_external, \
+         open(DIFF_OUT_KEYS, 'w') as file_out_keys, \
+         open(DIFF_OUT_UNMATCHED, 'w') as file_out_unmatched:
+        reader_old = csv.DictReader(file_old)
+        reader_new = csv.DictReader(file_new)
+        csvwriter_status = csv.writer(file_out_status)
+        csvwriter_external = csv.writer(file_out_external)
+        csvwriter_keys = csv.writer(file_out_keys)
+        csvwriter_unmatched = csv.writer(file_out_unmatched)
+
+        # Write headers
+        csvwriter_status.writerow(['rank', 'domain', 'old_status', 'new_status'])
+        csvwriter_external.writerow(['rank', 'domain', 'type', 'gained', 'lost'])
+        csvwriter_keys.writerow(['rank', 'domain', 'type', 'gained', 'lost'])
+        csvwriter_unmatched.writerow(['rank', 'old_domain', 'new_domain'])
+
+        old = nextRow(reader_old, old_name)
+        new = nextRow(reader_new, new_name)
+        while old is not None or new is not None:
+            # Ranks that only exist in one of the files
+            if new is None or (old is not None and old[0] < new[0]):
+                countRow(counts_old, old[1])
+                changes['only_old'] += 1
+                old = nextRow(reader_old, old_name, old)
+                continue
+            if old is None or new[0] < old[0]:
+                countRow(counts_new, new[1])
+                changes['only_new'] += 1
+                new = nextRow(reader_new, new_name, new)
+                continue
+
+            (rank, row_old) = old
+            row_new = new[1]
+            countRow(counts_old, row_old)
+            countRow(counts_new, row_new)
+            old = nextRow(reader_old, old_name, old)
+            new = nextRow(reader_new, new_name, new)
+
+            # The list changed at this rank, the results are not comparable
+            if row_old['domain'] != row_new['domain']:
+                changes['unmatched'] += 1
+                csvwriter_unmatched.writerow([rank, row_old['domain'], row_new['domain']])
+                continue
+
+            changes['matched'] += 1
+            domain = row_new['domain']
+
+            if row_old['status'] != row_new['status']:
+                changes['status'] += 1
+                csvwriter_status.writerow([rank, domain, row_old['status'], row_new['status']])
+
+            changed = False
+            for (column, kind) in [('polyfill_domains', 'polyfill'), ('manipulation_domains', 'manipulation')]:
+                before = decodeSet(row_old, column)
+                after = decodeSet(row_new, column)
+                if before != after:
+                    changed = True
+                    csvwriter_external.writerow([rank, domain, kind, json.dumps(sorted(after - before)), json.dumps(sorted(before - after))])
+            changes['external'] += changed
+
+            changed = False
+            for (column, kind) in [('ref_missmatches', 'ref'), ('func_missmatches', 'func'), ('flags', 'flag')]:
+                before = decodeSet(row_old, column)
+                after = decodeSet(row_new, column)
+                if before != after:
+                    changed = True
+                    csvwriter_keys.writerow([rank, domain, kind, json.dumps(sorted(after - before)), json.dumps(sorted(before - after))])
+            changes['keys'] += changed
+
+    # Summarize the differences between both runs
+    keys = sorted(set(counts_old) | set(counts_new))
+    deltas = {key: {
+        'old': counts_old.get(key, 0),
+        'new': counts_new.get(key, 0),
+        'delta': counts_new.get(key, 0) - counts_old.get(key, 0),
+    } for key in keys}
+    with open(DIFF_OUT_SUMMARY, 'w') as file_out_summary:
+        json.dump({
+            'old': old_name,
+            'new': new_name,
+            'changes': changes,
+            'deltas': deltas,
+        }, file_out_summary, indent=2)
+
+    print(f"Compared {changes['matched']} domains ({changes['unmatched']} ranks with different domains, {changes['only_old']} only in old, {changes['only_new']} only in new).\n")
+    print(f"Status changed: {changes['status']}")
+    print(f"External domains changed: {changes['external']}")
+    print(f"Keys or flags changed: {changes['keys']}")
+    print("")
+    for key, delta in deltas.items():
+        print(f"{key}: {delta['old']} -> {delta['new']} ({delta['delta']:+d})")
+    print("")
+    print(f"Generated the following files: {DIFF_OUT_STATUS} {DIFF_OUT_EXTERNAL} {DIFF_OUT_KEYS} {DIFF_OUT_UNMATCHED} {DIFF_OUT_SUMMARY}")
+
 def main(args):
-    # Get list of domains from https://tranco-list.eu/
-    tranco = Tranco(cache=True, cache_dir='.tranco')
-    trancolist = tranco.list(date=TRANCO_LIST_DATE).list
+    # Get list of domains from https://tranco-list.eu/ or a local file
+    with profiler.phase('list load'):
+        trancolist = tranco_list.load(date=TRANCO_LIST_DATE, file_name=args.list)
 
     # Initialize result list
-    for pos in range(NUM_DOMAINS):
-        results.append(ResultItem(pos+1, trancolist[pos]))
+    with profiler.phase('result init'):
+        for pos in range(NUM_DOMAINS):
+            results.append(ResultItem(pos+1, trancolist[pos]))
 
     # Increase the CSV field size limit
     # https://stackoverflow.com/a/54517228/4884643
@@ -207,7 +478,12 @@ def main(args):
         # Skip header
         next(csvreader, None)
 
+        # Measure the time spent reading and parsing the CSV file
+        if args.profile:
+            csvreader = profiler.iterate('csv read', csvreader)
+
         # Iterate over rows
+        profiler.enter('row processing')
         for (url, status_str, data) in csvreader:
             status = int(status_str)
             #print(url, status)
@@ -228,7 +504,7 @@ def main(args):
                 processData(pos, data)
             # Store if an external polyfill library was detected
             elif status == 2:
-                decoded = json.loads(data)
+                decoded = decodeJSON(data)
                 polyfill = decoded['polyfill']
                 #polyfillhost = urlparse(polyfill).hostname
                 eSLD = get_eSLD(polyfill)
@@ -251,6 +527,7 @@ def main(args):
             
             #if status > 0 and data != "":
             #    results[pos].data.append(data)
+        profiler.exit()
 
     # Counter variables
     count_failed = 0
@@ -271,6 +548,9 @@ def main(args):
     funcKeyCounter = {}
     flagCounter = {}
 
+    # Ranks of the results each term occurs at
+    postings = {}
+
     # Open output files
     with open(DATA_OUT, 'w') as file_out, \
          open(DATA_OUT_PDS, 'w') as file_out_pds, \
@@ -285,14 +565,24 @@ def main(args):
         csvwriter_fk = csv.writer(file_out_fk)
 
         # Write headers
-        csvwriter.writerow(['rank', 'domain', 'status', 'external_polyfill', 'external_manipulation', 'https', 'polyfill_domains', 'manipulation_domains'])
+        csvwriter.writerow(PROCESSED_COLUMNS)
         csvwriter_pds.writerow(['count', 'percent', 'domain', 'used_by'])
         csvwriter_mds.writerow(['count', 'percent', 'domain', 'target_domain'])
         csvwriter_rk.writerow(['count', 'percent', 'key'])
         csvwriter_fk.writerow(['count', 'percent', 'key'])
 
+        # Measure writing the processed results separately from the aggregation
+        writerow = csvwriter.writerow
+        if args.profile:
+            writerow = profiler.wrap('output writing', writerow)
+
+        profiler.enter('aggregation')
         for result in results:
-            csvwriter.writerow(result.encode())
+            writerow(result.encode())
+
+            # Results are ordered by rank, so the postings stay sorted
+            for term in result.terms():
+                postings.setdefault(term, []).append(result.rank)
 
             # Increase counter corresponding to the status
             if result.status == -1:
@@ -339,9 +629,12 @@ def main(args):
             if result.https:
                 count_https += 1
 
+        profiler.exit()
+
         total_processed = count_unmodified+count_modified
 
         # Process the external polyfills
+        profiler.enter('output writing')
         sorted_pdc = dict(sorted(polyfilldomain_counter.items(), key=lambda item: item[1], reverse=True))
         for domain, count in sorted_pdc.items():
             csvwriter_pds.writerow([count, percentof(count, total_processed), domain, json.dumps(polyfilldomain_usedby[domain])])
@@ -360,7 +653,27 @@ def main(args):
         sorted_fkc = dict(sorted(funcKeyCounter.items(), key=lambda item: item[1], reverse=True))
         for key, count in sorted_fkc.items():
             csvwriter_fk.writerow([count, percentof(count, total_processed), key])
+        profiler.exit()
     
+    # Write the inverted index, eg. for "query-index.py"
+    profiler.enter('output writing')
+    rank_index.build([result.domain for result in results], postings, DATA_OUT_INDEX)
+
+    # Write a machine-readable summary, eg. for "generate-figures.py"
+    with open(DATA_OUT_SUMMARY, 'w') as file_out_summary:
+        json.dump({
+            'total': NUM_DOMAINS,
+            'successful': total_processed,
+            'failed': count_failed,
+            'unmodified': count_unmodified,
+            'modified': count_modified,
+            'https': count_https,
+            'corejs': count_corejs,
+            'external_polyfill': count_external_polyfill,
+            'external_manipulation': count_external_manipulation,
+        }, file_out_summary, indent=2)
+    profiler.exit()
+
     success = percentof(total_processed, NUM_DOMAINS)
     print(f"Successfully gathered data from {total_processed} of {NUM_DOMAINS} domains. ({success:.2f}% success, {100-success:.2f}% failed)\n")
 
@@ -371,7 +684,7 @@ def main(args):
     print(f"External Polyfill: {count_external_polyfill} ({percentof(count_external_polyfill, total_processed):.2f}%)")
     print(f"External Modification: {count_external_manipulation} ({percentof(count_external_manipulation, total_processed):.2f}%)")
     print("")
-    print(f"Generated the following files: {DATA_OUT} {DATA_OUT_PDS} {DATA_OUT_MDS} {DATA_OUT_RK} {DATA_OUT_FK}")
+    print(f"Generated the following files: {DATA_OUT} {DATA_OUT_PDS} {DATA_OUT_MDS} {DATA_OUT_RK} {DATA_OUT_FK} {DATA_OUT_SUMMARY} {DATA_OUT_INDEX}")
 
 
 if __name__ == "__main__":
@@ -381,6 +694,11 @@ if __name__ == "__main__":
     parser.add_argument('-i', '--input', help="data input file", type=str, default=DATA_IN)
     parser.add_argument('-o', '--output', help="output file basename", type=str)
     parser.add_argument('-n', '--num', help="Total number of domains", type=int, default=NUM_DOMAINS)
+    parser.add_argument('-l', '--list', help="local list file (rank,domain) instead of the Tranco list", type=str)
+    parser.add_argument('-p', '--profile', help="report the time spent in each phase", action=argparse.BooleanOptionalAction, default=False)
+    parser.add_argument('--profile-out', help="JSON profile report output file", type=str)
+    parser.add_argument('--cprofile', help="cProfile stats output file", type=str)
+    parser.add_argument('-d', '--diff', help="compare two processed files instead of processing data", type=str, nargs=2, metavar=('OLD', 'NEW'))
     args = parser.parse_args()
 
     DATA_IN = args.input
@@ -395,10 +713,58 @@ if __name__ == "__main__":
     DATA_OUT_MDS = DATA_BASENAME+"_mds.csv"
     DATA_OUT_RK = DATA_BASENAME+"_rk.csv"
     DATA_OUT_FK = DATA_BASENAME+"_fk.csv"
+    DATA_OUT_SUMMARY = DATA_BASENAME+"_summary.json"
+    DATA_OUT_INDEX = DATA_BASENAME+"_index.bin"
+    DATA_OUT_PROFILE = args.profile_out or DATA_BASENAME+"_profile.json"
+
+    if args.diff:
+        # Name the diff after the new file, unless a basename was given.
+        # The suffix keeps it from overwriting the outputs of a normal run.
+        DIFF_BASENAME = (args.output or path.splitext(args.diff[1])[0].removesuffix("_processed"))+"_diff"
+        DIFF_OUT_STATUS = DIFF_BASENAME+"_status.csv"
+        DIFF_OUT_EXTERNAL = DIFF_BASENAME+"_external.csv"
+        DIFF_OUT_KEYS = DIFF_BASENAME+"_keys.csv"
+        DIFF_OUT_UNMATCHED = DIFF_BASENAME+"_unmatched.csv"
+        DIFF_OUT_SUMMARY = DIFF_BASENAME+"_summary.json"
+
+        start = time.time()
+        diffResults(args.diff[0], args.diff[1])
+        totaltime = floor(time.time() - start)
+        print("")
+        print(f'Took {totaltime} seconds.')
+        exit()
+
+    # Measure the fine-grained phases only when profiling, as this slows down processing
+    if args.profile:
+        decodeJSON = profiler.wrap('json decode', decodeJSON)
+        getPos = profiler.wrap('getPos lookups', getPos)
+        get_eSLD = profiler.wrap('eSLD resolution', get_eSLD)
+        extractDomainsFromTrace = profiler.wrap('stack trace extraction', extractDomainsFromTrace)
 
     start = time.time()
-    main(args)
-    totaltime = floor(time.time() - start)
+    if args.cprofile:
+        cProfile.run('main(args)', args.cprofile)
+    else:
+        main(args)
+    wall = time.time() - start
+    totaltime = floor(wall)
     print("")
     print(f'Debug: {non_matches} URLs could not be matched.')
     print(f'Took {totaltime} seconds.')
+
+    if args.profile:
+        report = profiler.report(wall)
+        report['input'] = DATA_IN
+        report['domains'] = NUM_DOMAINS
+        with open(DATA_OUT_PROFILE, 'w') as file_out_profile:
+            json.dump(report, file_out_profile, indent=2)
+
+        # Nested phases are included in the total but not in the self time
+        print("")
+        print(f"{'phase':<24} {'count':>10} {'total (s)':>10} {'self (s)':>10} {'self %':>7}")
+        for name, phase in report['phases'].items():
+            print(f"{name:<24} {phase['count']:>10} {phase['total']:>10.3f} {phase['self']:>10.3f} {phase['percent']:>7.2f}")
+        print("")
+        print(f"Generated the following files: {DATA_OUT_PROFILE}")
+    if args.cprofile:
+        print(f"Generated the following files: {args.cprofile}")
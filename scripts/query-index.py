@@ -0,0 +1,96 @@
+#!/bin/env python
+
+import time
+import argparse
+from itertools import islice
+from sys import exit
+import rank_index
+
+# Index generated by "process-data.py"
+INDEX_IN = 'data_index.bin'
+
+# Number of results shown by default
+TOP = 20
+
+
+# Iterate over the ranks matching all terms of --all, any term of --any and no term of --not in ascending order.
+# The posting lists are merged lazily, so only the ranks that are consumed are computed.
+def query(index: rank_index.RankIndex, required: list[str], alternatives: list[str], exclude: list[str]):
+    lists = [index.ranks(term) for term in required]
+    if alternatives:
+        alternative_lists = [index.ranks(term) for term in alternatives]
+        if not lists:
+            ranks = rank_index.union(alternative_lists)
+        elif sum(map(len, alternative_lists)) < min(map(len, lists)):
+            # Few alternatives, merge them and let them drive the intersection
+            ranks = rank_index.intersect(lists + [list(rank_index.union(alternative_lists))])
+        else:
+            ranks = rank_index.any_of(rank_index.intersect(lists), alternative_lists)
+    else:
+        ranks = rank_index.intersect(lists)
+
+    if exclude:
+        ranks = rank_index.difference(ranks, [index.ranks(term) for term in exclude])
+    return ranks
+
+# Number of ranks matching the query. Set operations are faster than merging when all ranks are needed.
+def countMatches(index: rank_index.RankIndex, required: list[str], alternatives: list[str], exclude: list[str]) -> int:
+    ranks = None
+    for term in sorted(required, key=index.count):
+        ranks = set(index.ranks(term)) if ranks is None else ranks.intersection(index.ranks(term))
+    if alternatives:
+        matches = set().union(*(index.ranks(term) for term in alternatives))
+        ranks = matches if ranks is None else ranks & matches
+    for term in exclude:
+        ranks.difference_update(index.ranks(term))
+    return len(ranks)
+
+def main(args):
+    start = time.perf_counter()
+    index = rank_index.RankIndex(args.index)
+
+    # List the most frequent terms
+    if args.terms is not None:
+        counts = sorted(((index.count(term), term) for term in index.terms(args.terms)), reverse=True)
+        took = (time.perf_counter() - start) * 1000
+        for (count, term) in counts[:args.top]:
+            print(f'{count} {term}')
+        print(f'{len(counts)} terms, took {took:.1f} ms')
+        return
+
+    if not args.all and not args.any:
+        exit('At least one term is required, see --help')
+
+    # Stop after the shown results, the total is only counted on request
+    ranks = list(islice(query(index, args.all, args.any, args.exclude), args.top))
+    took = (time.perf_counter() - start) * 1000
+    for rank in ranks:
+        print(f'{rank} {index.domain(rank)}')
+
+    if len(ranks) < args.top:
+        print(f'{len(ranks)} domains, took {took:.1f} ms')
+    elif args.count:
+        total = countMatches(index, args.all, args.any, args.exclude)
+        took = (time.perf_counter() - start) * 1000
+        print(f'{total} domains, took {took:.1f} ms')
+    else:
+        print(f'first {len(ranks)} domains, took {took:.1f} ms (--count for the total)')
+
+
+if __name__ == "__main__":
+
+    # Parse arguments
+    parser = argparse.ArgumentParser(
+        description="Query the inverted index of processed results. "
+        "Terms: status:<n>, is:https, is:external_polyfill, is:external_manipulation, "
+        "ref:<key>, func:<key>, flag:<flag>, polyfill:<domain>, manipulation:<domain>")
+    parser.add_argument('index', help="index file", nargs='?', default=INDEX_IN)
+    parser.add_argument('-a', '--all', help="term that must match (AND, repeatable)", action='append', default=[])
+    parser.add_argument('-o', '--any', help="term of which at least one must match (OR, repeatable)", action='append', default=[])
+    parser.add_argument('-x', '--not', dest='exclude', help="term that must not match (repeatable)", action='append', default=[])
+    parser.add_argument('-n', '--top', help="number of results shown", type=int, default=TOP)
+    parser.add_argument('-c', '--count', help="count all matching domains", action=argparse.BooleanOptionalAction, default=False)
+    parser.add_argument('-t', '--terms', help="list the most frequent terms with the given prefix", type=str)
+    args = parser.parse_args()
+
+    main(args)
@@ -0,0 +1,223 @@
+import heapq
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+
+
+# Magic bytes and version of the index file format
+MAGIC = b'WAMINDX1'
+# magic, byte order, number of domains, number of terms, offsets of the
+# domain offsets, domain strings, term offsets, term strings, posting offsets and postings
+HEADER = struct.Struct('<8s8sQQQQQQQQ')
+
+
+def _string_table(strings: list[str]) -> tuple[array, bytes]:
+    """Encode strings as offsets into a single blob.
+    """
+    encoded = [string.encode() for string in strings]
+    offsets = array('Q', [0]) * (len(encoded) + 1)
+    offset = 0
+    for i, string in enumerate(encoded):
+        offsets[i] = offset
+        offset += len(string)
+    offsets[len(encoded)] = offset
+    return offsets, b''.join(encoded)
+
+
+def build(domains: list[str], postings: dict[str, list[int]], file_name: str):
+    """Write an inverted index to a file.
+
+    domains contains the domain of each rank (rank 1 at position 0),
+    postings maps each term to the ascending ranks it occurs at.
+    Terms are stored sorted, so they can be found by binary search.
+    """
+    terms = sorted(postings)
+    domain_offsets, domain_strings = _string_table(domains)
+    term_offsets, term_strings = _string_table(terms)
+
+    posting_offsets = array('Q', [0]) * (len(terms) + 1)
+    ranks = array('I')
+    for i, term in enumerate(terms):
+        posting_offsets[i] = len(ranks)
+        ranks.extend(postings[term])
+    posting_offsets[len(terms)] = len(ranks)
+
+    sections = [domain_offsets, domain_strings, term_offsets, term_strings, posting_offsets, ranks]
+    positions = []
+    position = HEADER.size
+    for section in sections:
+        positions.append(position)
+        position += len(section) * (section.itemsize if isinstance(section, array) else 1)
+        # Align sections, so that they can be cast to arrays
+        position += -position % 8
+    byteorder = sys.byteorder.encode().ljust(8, b'\0')
+
+    # Write to a temporary file first, so that readers never see a partial index
+    tmp_name = '%s.%d.tmp' % (file_name, os.getpid())
+    with open(tmp_name, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, byteorder, len(domains), len(terms), *positions))
+        for section, position in zip(sections, positions):
+            file.write(b'\0' * (position - file.tell()))
+            file.write(section if isinstance(section, bytes) else section.tobytes())
+    os.replace(tmp_name, file_name)
+
+
+class RankIndex():
+    """Read-only inverted index backed by a memory-mapped file.
+    """
+
+    def __init__(self, file_name: str):
+        with open(file_name, 'rb') as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (magic, byteorder, num_domains, num_terms, domain_offsets_at, domain_strings_at,
+         term_offsets_at, term_strings_at, posting_offsets_at, ranks_at) = \
+            HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError('not an inverted index: %s' % (file_name,))
+        if byteorder.rstrip(b'\0').decode() != sys.byteorder:
+            raise ValueError('index was built on a machine with a different byte order: %s' % (file_name,))
+
+        view = memoryview(self._mmap)
+        self._num_domains = num_domains
+        self._num_terms = num_terms
+        self._domain_offsets = view[domain_offsets_at:domain_offsets_at + 8 * (num_domains + 1)].cast('Q')
+        self._domain_strings = view[domain_strings_at:]
+        self._term_offsets = view[term_offsets_at:term_offsets_at + 8 * (num_terms + 1)].cast('Q')
+        self._term_strings = view[term_strings_at:]
+        self._posting_offsets = view[posting_offsets_at:posting_offsets_at + 8 * (num_terms + 1)].cast('Q')
+        num_ranks = self._posting_offsets[num_terms]
+        self._ranks = view[ranks_at:ranks_at + 4 * num_ranks].cast('I')
+
+    def __len__(self) -> int:
+        return self._num_domains
+
+    def __contains__(self, term: str) -> bool:
+        return self._find(term) != -1
+
+    def domain(self, rank: int) -> str:
+        """Domain at the given (1-based) rank.
+        """
+        offsets = self._domain_offsets
+        return bytes(self._domain_strings[offsets[rank - 1]:offsets[rank]]).decode()
+
+    def term(self, i: int) -> str:
+        offsets = self._term_offsets
+        return bytes(self._term_strings[offsets[i]:offsets[i + 1]]).decode()
+
+    def terms(self, prefix: str = ''):
+        """Iterate over all terms starting with the given prefix in sorted order.
+        """
+        i = self._bisect(prefix)
+        while i < self._num_terms:
+            term = self.term(i)
+            if not term.startswith(prefix):
+                break
+            yield term
+            i += 1
+
+    def _bisect(self, term: str) -> int:
+        lo, hi = 0, self._num_terms
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.term(mid) < term:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _find(self, term: str) -> int:
+        i = self._bisect(term)
+        if i < self._num_terms and self.term(i) == term:
+            return i
+        return -1
+
+    def ranks(self, term: str) -> memoryview:
+        """Ascending ranks of the domains the term occurs at.
+        """
+        i = self._find(term)
+        if i == -1:
+            return self._ranks[0:0]
+        return self._ranks[self._posting_offsets[i]:self._posting_offsets[i + 1]]
+
+    def count(self, term: str) -> int:
+        i = self._find(term)
+        if i == -1:
+            return 0
+        return self._posting_offsets[i + 1] - self._posting_offsets[i]
+
+
+def _gallop(ranks, rank: int, lo: int) -> int:
+    """Position of the first rank not smaller than the given rank, searching from lo.
+    The distance is doubled until the rank is passed, so short skips stay cheap.
+    """
+    n = len(ranks)
+    hi = lo
+    step = 1
+    while hi < n and ranks[hi] < rank:
+        lo = hi + 1
+        hi += step
+        step *= 2
+    return bisect_left(ranks, rank, lo, min(hi, n))
+
+
+def intersect(lists: list):
+    """Iterate over the ranks contained in all of the given ascending lists in ascending order.
+    """
+    if not lists:
+        return
+    lists = sorted(lists, key=len)
+    first, others = lists[0], lists[1:]
+    positions = [0] * len(others)
+    pos = 0
+    while pos < len(first):
+        rank = first[pos]
+        for i, other in enumerate(others):
+            positions[i] = _gallop(other, rank, positions[i])
+            if positions[i] == len(other):
+                return
+            if other[positions[i]] != rank:
+                # Skip the ranks of the first list the other one does not contain
+                pos = _gallop(first, other[positions[i]], pos + 1)
+                break
+        else:
+            yield rank
+            pos += 1
+
+
+def union(lists: list):
+    """Iterate over the ranks contained in any of the given ascending lists in ascending order.
+    """
+    previous = None
+    for rank in heapq.merge(*lists):
+        if rank != previous:
+            yield rank
+            previous = rank
+
+
+def _filter(ranks, lists: list, contained: bool):
+    positions = [0] * len(lists)
+    for rank in ranks:
+        found = False
+        for i, other in enumerate(lists):
+            positions[i] = _gallop(other, rank, positions[i])
+            if positions[i] < len(other) and other[positions[i]] == rank:
+                found = True
+                break
+        if found == contained:
+            yield rank
+
+
+def any_of(ranks, lists: list):
+    """Iterate over the ascending ranks that are contained in any of the given ascending lists.
+    """
+    return _filter(ranks, lists, True)
+
+
+def difference(ranks, lists: list):
+    """Iterate over the ascending ranks that are contained in none of the given ascending lists.
+    """
+    return _filter(ranks, lists, False)
@@ -0,0 +1,171 @@
+import csv
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+
+
+# Magic bytes and version of the index file format
+MAGIC = b'WAMLIST1'
+# magic, byte order, number of domains, number of hash slots,
+# offset of the domain offsets, offset of the hash slots, offset of the strings
+HEADER = struct.Struct('<8s8sQQQQQ')
+# Hash slot value of an empty slot, slots store the position + 1
+EMPTY = 0
+# File extension of index files
+EXTENSION = '.wamidx'
+
+
+def _hash(domain: bytes) -> int:
+    """Stable hash of a domain that is identical across processes.
+    """
+    return zlib.crc32(domain)
+
+
+def _slot_count(num: int) -> int:
+    """Number of hash slots for the given number of domains.
+    A power of two that keeps the load factor below 0.5.
+    """
+    slots = 1
+    while slots < num * 2:
+        slots *= 2
+    return slots
+
+
+def build(domains: list[str], file_name: str):
+    """Write a list of domains, ordered by rank, to a compact index file.
+
+    The file consists of a header, the offsets of the domains in the string
+    table, an open-addressing hash table that maps domains to positions and
+    the string table containing all domains in rank order.
+    """
+    num = len(domains)
+    slots = _slot_count(num)
+
+    encoded = [domain.encode() for domain in domains]
+    offsets = array('I', [0]) * (num + 1)
+    table = array('I', [EMPTY]) * slots
+    mask = slots - 1
+
+    offset = 0
+    for pos, domain in enumerate(encoded):
+        offsets[pos] = offset
+        offset += len(domain)
+
+        # Linear probing, keep the first (best ranked) position of duplicates
+        slot = _hash(domain) & mask
+        while table[slot] != EMPTY:
+            if encoded[table[slot] - 1] == domain:
+                break
+            slot = (slot + 1) & mask
+        else:
+            table[slot] = pos + 1
+    offsets[num] = offset
+
+    offsets_at = HEADER.size
+    table_at = offsets_at + offsets.itemsize * len(offsets)
+    strings_at = table_at + table.itemsize * len(table)
+    byteorder = sys.byteorder.encode().ljust(8, b'\0')
+
+    # Write to a temporary file first, so that readers never see a partial index
+    tmp_name = '%s.%d.tmp' % (file_name, os.getpid())
+    with open(tmp_name, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, byteorder, num, slots, offsets_at, table_at, strings_at))
+        offsets.tofile(file)
+        table.tofile(file)
+        for domain in encoded:
+            file.write(domain)
+    os.replace(tmp_name, file_name)
+
+
+class DomainList():
+    """Read-only list of domains backed by a memory-mapped index file.
+
+    Positions are 0-based, like the list returned by the Tranco client.
+    The pages of the file are shared between all processes using it.
+    """
+
+    def __init__(self, file_name: str):
+        with open(file_name, 'rb') as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (magic, byteorder, num, slots, offsets_at, table_at, strings_at) = \
+            HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError('not a domain list index: %s' % (file_name,))
+        if byteorder.rstrip(b'\0').decode() != sys.byteorder:
+            raise ValueError('index was built on a machine with a different byte order: %s' % (file_name,))
+
+        view = memoryview(self._mmap)
+        self._num = num
+        self._mask = slots - 1
+        self._offsets = view[offsets_at:table_at].cast('I')
+        self._table = view[table_at:strings_at].cast('I')
+        self._strings = view[strings_at:]
+
+    def __len__(self) -> int:
+        return self._num
+
+    def _raw(self, pos: int) -> bytes:
+        return bytes(self._strings[self._offsets[pos]:self._offsets[pos + 1]])
+
+    def __getitem__(self, pos: int) -> str:
+        if pos < 0:
+            pos += self._num
+        if not 0 <= pos < self._num:
+            raise IndexError('domain list index out of range')
+        return self._raw(pos).decode()
+
+    def __iter__(self):
+        for pos in range(self._num):
+            yield self._raw(pos).decode()
+
+    def __contains__(self, domain: str) -> bool:
+        return self.pos(domain) != -1
+
+    def pos(self, domain: str) -> int:
+        """Position of a domain in the list or -1 if it is not listed.
+        """
+        encoded = domain.encode()
+        slot = _hash(encoded) & self._mask
+        while True:
+            value = self._table[slot]
+            if value == EMPTY:
+                return -1
+            if self._raw(value - 1) == encoded:
+                return value - 1
+            slot = (slot + 1) & self._mask
+
+
+def read_csv(file_name: str) -> list[str]:
+    """Read a list in the Tranco CSV format (rank,domain) ordered by rank.
+    """
+    with open(file_name, 'r') as file:
+        return [row[1] for row in csv.reader(file) if row]
+
+
+def load(date: str = None, file_name: str = None, cache_dir: str = '.tranco') -> DomainList:
+    """Return the memory-mapped list of the given date or local CSV file.
+
+    The index is built once and reused afterwards. A local file is used
+    without accessing the network; its index is stored next to it.
+    """
+    if file_name:
+        index_name = file_name + EXTENSION
+        if (not os.path.exists(index_name)
+                or os.path.getmtime(index_name) < os.path.getmtime(file_name)):
+            build(read_csv(file_name), index_name)
+        return DomainList(index_name)
+
+    if not date:
+        raise ValueError('either a list date or a file name is required')
+
+    index_name = os.path.join(cache_dir, date + EXTENSION)
+    if not os.path.exists(index_name):
+        # Only import the Tranco client when the list has to be downloaded
+        from tranco import Tranco
+        tranco = Tranco(cache=True, cache_dir=cache_dir)
+        build(tranco.list(date=date).list, index_name)
+    return DomainList(index_name)